@@ -7,94 +7,190 @@ import csv
 import re
 import math
 import shutil
+import threading
 from collections import Counter
+from pathlib import Path
+from functools import lru_cache
+from itertools import compress
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+_SAFE_FN_RE = re.compile(r"[^A-Za-z0-9._-]+")
+_RANK_PREFIX_RE = re.compile(r"^(?:rank\s*)?r[123]\s*[:_\-]+", re.IGNORECASE)
+# any run of spaces/underscores -> one "_" (single pass; no quadratic replace loop)
+_SEP_RUN_RE = re.compile(r"[ _]+")
+# chrome-ball renders: *.png with an _ev-00/_ev-25/_ev-50 tag anywhere in the name
+_BALL_RE = re.compile(r"_ev-(?:00|25|50).*\.png\Z", re.IGNORECASE | re.DOTALL)
+
+# stripped outermost-first, so "x_points.json.gz" loses all three
+_TRAIL_SUFFIXES = (".gz", ".json", "_points")
+# priority order: when several appear in a name, the earliest listed wins
+_EV_NAMES = ("ev-00", "ev-25", "ev-50")
+_EV_TAGS = tuple("_" + ev for ev in _EV_NAMES)
 
 
 # ---------------------------- helpers ----------------------------
 def _to_json_safe(obj):
-    try:
-        import numpy as np
+    if np is not None:
         if isinstance(obj, (np.integer,)):
             return int(obj)
         if isinstance(obj, (np.floating,)):
             return float(obj)
         if isinstance(obj, (np.ndarray,)):
             return obj.tolist()
-    except Exception:
-        pass
     return str(obj)
 
 
-def safe_filename(name: str) -> str:
-    s = re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)).strip("_")
+def _json_ready(col):
+    """
+    Turn a NumPy payload column into plain Python so the C JSON encoder does
+    not fall back to _to_json_safe per element: ndarrays via .tolist(), and
+    lists of NumPy scalars (e.g. rank from the pickle) via one np.asarray pass.
+    Anything else is returned untouched.
+    """
+    if np is None:
+        return col
+    if isinstance(col, np.ndarray):
+        return col.tolist()
+    if isinstance(col, list):
+        first = next((v for v in col if v is not None), None)
+        if isinstance(first, np.generic):
+            try:
+                arr = np.asarray(col)
+            except (OverflowError, TypeError, ValueError):
+                return col
+            if arr.dtype.kind in "iuf":
+                return arr.tolist()
+    return col
+
+
+@lru_cache(maxsize=65536)
+def _safe_filename_str(name: str) -> str:
+    s = _SAFE_FN_RE.sub("_", name).strip("_")
     return s if s else "untitled"
 
 
+def safe_filename(name: str) -> str:
+    # str() first so arbitrary (even unhashable) inputs still work with the cache
+    return _safe_filename_str(str(name))
+
+
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-def copy_file_if_needed(src: str, dst: str):
-    ensure_dir(os.path.dirname(dst))
-    if os.path.exists(dst):
+def list_dir_names(path: str) -> set:
+    """Names already present in `path` (one scandir instead of a stat per file)."""
+    try:
+        with os.scandir(path) as it:
+            return {e.name for e in it}
+    except OSError:
+        return set()
+
+
+def queue_copy_if_needed(jobs: list, src: str, dst: str, existing: set):
+    """
+    Append (src, dst) to `jobs` unless dst's name is in `existing` (names from
+    list_dir_names of dst's folder, which must exist). Keeps `existing` up to
+    date so a later source with the same name is skipped, as with sequential copies.
+    """
+    name = os.path.basename(dst)
+    if name in existing:
+        return
+    existing.add(name)
+    jobs.append((src, dst))
+
+
+def _default_io_workers() -> int:
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def copy_files(jobs, max_workers=None):
+    """
+    Copy (src, dst) pairs concurrently. File copies are I/O bound and copyfile
+    releases the GIL inside the syscall, so threads overlap them well.
+    Contents only: the site does not need source mtimes/permissions, and
+    copyfile takes the kernel fast path.
+    """
+    jobs = list(jobs)
+    if max_workers is None:
+        max_workers = _default_io_workers()
+    if len(jobs) <= 1 or max_workers <= 1:
+        for src, dst in jobs:
+            shutil.copyfile(src, dst)
         return
-    shutil.copy2(src, dst)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as ex:
+        for _ in ex.map(lambda job: shutil.copyfile(*job), jobs):
+            pass
 
 
 def _extract_ev_tag(s: str) -> str:
     if not s:
         return ""
     s = str(s)
-    for ev in ("ev-00", "ev-25", "ev-50"):
+    for ev in _EV_NAMES:
         if ev in s:
             return ev
     return ""
 
 
 def _normalize_id_and_ev(s: str):
-    s = str(s).strip()
-    s = os.path.basename(s)
+    # ids repeat across ranks and CSV rows, so the pure string work is cached
+    return _normalize_id_and_ev_str(str(s))
 
-    ev = _extract_ev_tag(s)
+
+@lru_cache(maxsize=65536)
+def _normalize_id_and_ev_str(s: str):
+    s = s.strip()
+    s = os.path.basename(s)
 
     low = s.lower()
-    if low.endswith(".gz"):
-        s = s[:-3]
-        low = s.lower()
-    if low.endswith(".json"):
-        s = s[:-5]
-        low = s.lower()
-
-    if low.endswith("_points"):
-        s = s[:-7]
-        low = s.lower()
-
-    for tag in ("_ev-00", "_ev-25", "_ev-50"):
+    for suf in _TRAIL_SUFFIXES:
+        if low.endswith(suf):
+            s = s[: -len(suf)]
+            low = low[: -len(suf)]
+
+    # the stripped _ev-XX suffix is usually the tag; same result as
+    # _extract_ev_tag(s) without rescanning for it
+    ev = ""
+    for tag in _EV_TAGS:
         if low.endswith(tag):
+            if s.endswith(tag):
+                ev = tag[1:]
             s = s[: -len(tag)]
-            low = s.lower()
+            break
+    # ...unless a higher-priority tag appears elsewhere in the name
+    for name in _EV_NAMES:
+        if name == ev:
+            break
+        if name in s:
+            ev = name
             break
 
-    s = re.sub(r"^(?:rank\s*)?r[123]\s*[:_\-]+", "", s, flags=re.IGNORECASE)
+    s = _RANK_PREFIX_RE.sub("", s)
 
-    s = s.replace(" ", "_")
-    while "__" in s:
-        s = s.replace("__", "_")
+    s = _SEP_RUN_RE.sub("_", s)
     s = s.strip("_")
 
     return s, ev
 
 
-def confidence_from_row(row, E_good=1.0, E_bad=8.0):
-    try:
-        frac = float(row.get("inlier_weight_frac", 0.0))
-    except Exception:
-        frac = 0.0
-    try:
-        mae = float(row.get("mae_in_deg_weighted", 1e9))
-    except Exception:
-        mae = 1e9
-
+def confidence_from_values(frac: float, mae: float, E_good=1.0, E_bad=8.0) -> float:
     if E_bad <= E_good:
         mae_conf = 1.0 if mae <= E_good else 0.0
     else:
@@ -110,6 +206,34 @@ def confidence_from_row(row, E_good=1.0, E_bad=8.0):
     return max(0.0, min(1.0, conf))
 
 
+def confidences_from_arrays(fracs, maes, E_good=1.0, E_bad=8.0):
+    """
+    Batched confidence_from_values over parallel frac/mae sequences.
+    Uses NumPy when available; NaN results clamp to 1.0 like the scalar path.
+    """
+    if np is None:
+        return [confidence_from_values(fr, m, E_good=E_good, E_bad=E_bad) for fr, m in zip(fracs, maes)]
+
+    fracs = np.asarray(fracs, dtype=np.float64)
+    maes = np.asarray(maes, dtype=np.float64)
+    with np.errstate(invalid="ignore", over="ignore"):
+        if E_bad <= E_good:
+            mae_conf = np.where(maes <= E_good, 1.0, 0.0)
+        else:
+            t = (maes - E_good) / (E_bad - E_good)
+            mae_conf = np.where(t < 0.0, 1.0, np.where(t > 1.0, 0.0, 1.0 - t))
+        conf = fracs * mae_conf
+        conf = np.where(np.isnan(conf), 1.0, np.clip(conf, 0.0, 1.0))
+    return conf.tolist()
+
+
+def _csv_cell(row, i, default):
+    # same fallbacks as DictReader + .get(): absent column -> default, short row -> None
+    if i is None:
+        return default
+    return row[i] if i < len(row) else None
+
+
 def load_confidence_map_by_id_and_rank(csv_path: str, desired_ev: str, E_good=1.0, E_bad=8.0, debug=False):
     conf_map = {}
     if not csv_path:
@@ -118,27 +242,61 @@ def load_confidence_map_by_id_and_rank(csv_path: str, desired_ev: str, E_good=1.
         print(f"WARNING: CSV not found: {csv_path}")
         return conf_map
 
-    kept = 0
+    keys = []
+    fracs = []
+    maes = []
     skipped_ev = 0
     skipped_rank = 0
+    # rank cells are a handful of distinct strings; parse each one once
+    # (None marks a cell that doesn't parse)
+    ranks = {}
 
     with open(csv_path, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
+        r = csv.reader(f)
+        header = next(r, [])
+        col = {name: i for i, name in enumerate(header)}
+        i_rank = col.get("rank")
+        i_file = col.get("file")
+        i_frac = col.get("inlier_weight_frac")
+        i_mae = col.get("mae_in_deg_weighted")
+
         for row in r:
+            if not row:
+                continue
+            cell = _csv_cell(row, i_rank, "0")
             try:
-                rk = int(float(row.get("rank", "0")))
-            except Exception:
+                rk = ranks[cell]
+            except KeyError:
+                try:
+                    rk = int(float(cell))
+                except Exception:
+                    rk = None
+                ranks[cell] = rk
+            if rk is None:
                 skipped_rank += 1
                 continue
 
-            base_id, ev = _normalize_id_and_ev(row.get("file", ""))
+            base_id, ev = _normalize_id_and_ev(_csv_cell(row, i_file, ""))
 
             if desired_ev and ev != desired_ev:
                 skipped_ev += 1
                 continue
 
-            conf_map[(base_id, rk)] = confidence_from_row(row, E_good=E_good, E_bad=E_bad)
-            kept += 1
+            try:
+                frac = float(_csv_cell(row, i_frac, 0.0))
+            except Exception:
+                frac = 0.0
+            try:
+                mae = float(_csv_cell(row, i_mae, 1e9))
+            except Exception:
+                mae = 1e9
+
+            keys.append((base_id, rk))
+            fracs.append(frac)
+            maes.append(mae)
+
+    conf_map = dict(zip(keys, confidences_from_arrays(fracs, maes, E_good=E_good, E_bad=E_bad)))
+    kept = len(keys)
 
     print(f"[CSV] Loaded confidence rows kept={kept} | skipped_ev={skipped_ev} | skipped_rank={skipped_rank}")
     if debug:
@@ -147,6 +305,21 @@ def load_confidence_map_by_id_and_rank(csv_path: str, desired_ev: str, E_good=1.
     return conf_map
 
 
+# point fields tried, in order, when matching a point to its CSV confidence row
+CONF_ID_KEYS = ("painting_info", "painting_rank_id", "pose_info", "img_path", "file")
+
+
+def index_confidence_by_id(conf_map):
+    """
+    {(base_id, rank): conf} -> {base_id: {rank: conf}}, so a point's candidate
+    ids can be rejected with one lookup before the rank is considered.
+    """
+    by_id = {}
+    for (base_id, rk), v in conf_map.items():
+        by_id.setdefault(base_id, {})[rk] = v
+    return by_id
+
+
 # ---------------- physical direction extraction ----------------
 DIR_KEY_CANDIDATES = [
     ("dir_x", "dir_y", "dir_z"),
@@ -164,7 +337,15 @@ SINGLE_VEC_CANDIDATES = [
 ]
 
 
+# (kx, ky, kz, source label) so the label isn't re-formatted per point
+_DIR_KEYS_FLAT = tuple((kx, ky, kz, f"{kx},{ky},{kz}") for kx, ky, kz in DIR_KEY_CANDIDATES)
+
+
 def _as_float(x):
+    # plain floats (the common case) skip the try/except setup; ints still go
+    # through it, since float() overflows on very large ones
+    if type(x) is float:
+        return x
     try:
         return float(x)
     except Exception:
@@ -172,13 +353,20 @@ def _as_float(x):
 
 
 def extract_direction_components(d: dict):
-    for kx, ky, kz in DIR_KEY_CANDIDATES:
-        if kx in d and ky in d and kz in d:
-            x = _as_float(d.get(kx))
-            y = _as_float(d.get(ky))
-            z = _as_float(d.get(kz))
-            if x is not None and y is not None and z is not None:
-                return x, y, z, f"{kx},{ky},{kz}"
+    dget = d.get
+    for kx, ky, kz, src in _DIR_KEYS_FLAT:
+        vx = dget(kx)
+        if vx is None:
+            continue
+        vy = dget(ky)
+        vz = dget(kz)
+        if vy is None or vz is None:
+            continue
+        x = _as_float(vx)
+        y = _as_float(vy)
+        z = _as_float(vz)
+        if x is not None and y is not None and z is not None:
+            return x, y, z, src
 
     for vk in SINGLE_VEC_CANDIDATES:
         if vk in d:
@@ -211,826 +399,419 @@ def normalize_vec(x, y, z, eps=1e-12):
     return x / n, y / n, z / n, n
 
 
+if njit is not None:
+    # eager signature + on-disk cache: compiled once, no JIT pause on later runs.
+    # No fastmath, so results stay bit-identical to the NumPy/scalar paths.
+    @njit("void(f8[:, :], f8[:, :], f8[:], f8)", parallel=True, cache=True)
+    def _normalize_rows_nb(raw, unit, norms, eps):
+        for i in prange(raw.shape[0]):
+            x = raw[i, 0]
+            y = raw[i, 1]
+            z = raw[i, 2]
+            n = math.sqrt(x * x + y * y + z * z)
+            norms[i] = n
+            if math.isfinite(n) and n >= eps:
+                unit[i, 0] = x / n
+                unit[i, 1] = y / n
+                unit[i, 2] = z / n
+            else:
+                unit[i, 0] = math.nan
+                unit[i, 1] = math.nan
+                unit[i, 2] = math.nan
+else:
+    _normalize_rows_nb = None
+
+
+def normalize_vecs_np(xyz, eps=1e-12):
+    """
+    Batched normalize_vec for an (N, 3) float array. Returns (unit, n); rows
+    whose norm is non-finite or below eps come back as NaN in `unit`.
+    Uses a parallel Numba kernel when numba is installed.
+    """
+    if _normalize_rows_nb is not None:
+        raw = np.ascontiguousarray(xyz, dtype=np.float64)
+        unit = np.empty_like(raw)
+        n = np.empty(raw.shape[0], dtype=np.float64)
+        _normalize_rows_nb(raw, unit, n, float(eps))
+        return unit, n
+
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    with np.errstate(invalid="ignore", over="ignore"):
+        n = np.sqrt(x * x + y * y + z * z)
+        bad = ~np.isfinite(n) | (n < eps)
+        unit = xyz / np.where(bad, 1.0, n)[:, None]
+    unit[bad] = np.nan
+    return unit, n
+
+
+def unit_direction_columns(xs, ys, zs, normalize=True, eps=1e-12):
+    """
+    Normalize parallel x/y/z lists. Returns lists (ux, uy, uz, ok): ok[i] is
+    False where the norm is non-finite or below eps. With normalize=False the
+    raw vector is passed through and every row is ok. Runs as one NumPy pass
+    when available.
+    """
+    if not normalize:
+        return list(xs), list(ys), list(zs), [True] * len(xs)
+
+    if np is None or not xs:
+        ux, uy, uz, ok = [], [], [], []
+        for x, y, z in zip(xs, ys, zs):
+            a, b, c, _ = normalize_vec(x, y, z, eps=eps)
+            ux.append(a)
+            uy.append(b)
+            uz.append(c)
+            ok.append(a is not None)
+        return ux, uy, uz, ok
+
+    count = len(xs)
+    raw = np.empty((count, 3), dtype=np.float64)
+    raw[:, 0] = np.fromiter(xs, dtype=np.float64, count=count)
+    raw[:, 1] = np.fromiter(ys, dtype=np.float64, count=count)
+    raw[:, 2] = np.fromiter(zs, dtype=np.float64, count=count)
+    unit, n = normalize_vecs_np(raw, eps=eps)
+    ok = np.isfinite(n) & (n >= eps)
+    return unit[:, 0].tolist(), unit[:, 1].tolist(), unit[:, 2].tolist(), ok.tolist()
+
+
 # ---------------------------- recursive indexing ----------------------------
-def build_basename_index(root_dir: str):
+def iter_file_entries(root_dir: str):
     """
-    Map filename basename -> full path (first occurrence wins).
-    This is what makes nested artist folders work.
+    Yield os.DirEntry for every non-directory under root_dir, in the same
+    top-down order as os.walk (files of a folder before its subfolders).
+    Uses os.scandir directly so file/dir checks come from the cached d_type.
     """
-    idx = {}
-    for r, _dirs, files in os.walk(root_dir):
-        for fn in files:
-            if fn not in idx:
-                idx[fn] = os.path.join(r, fn)
-    return idx
+    stack = [root_dir]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for e in it:
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    yield e
+                elif not e.is_symlink():
+                    subdirs.append(e.path)
+        stack.extend(reversed(subdirs))
+
+
+def _find_in_tree(root_dir: str, needed, stop):
+    # first path per needed basename under root_dir, in walk order; gives up
+    # early once everything is found here or `stop` is set
+    found = {}
+    for e in iter_file_entries(root_dir):
+        if stop.is_set():
+            break
+        name = e.name
+        if name in needed and name not in found:
+            found[name] = e.path
+            if len(found) == len(needed):
+                break
+    return found
+
+
+def find_files_by_basename(root_dir: str, needed, max_workers=None):
+    """
+    Map each basename in `needed` to its first path under root_dir, in os.walk
+    order. This is what makes nested artist folders work.
+    Top-level subfolders (typically one per artist) are searched on a thread
+    pool and merged in walk order, so the winner is the same as a serial walk;
+    the search stops once the folders merged so far cover every needed name.
+    """
+    found = {}
+    if not needed:
+        return found
+    subdirs = []
+    try:
+        with os.scandir(root_dir) as it:
+            for e in it:
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    if e.name in needed:
+                        found.setdefault(e.name, e.path)
+                elif not e.is_symlink():
+                    subdirs.append(e.path)
+    except OSError:
+        return found
+
+    stop = threading.Event()
+    if max_workers is None:
+        max_workers = _default_io_workers()
+    if len(subdirs) <= 1 or max_workers <= 1:
+        for sub in subdirs:
+            if len(found) == len(needed):
+                break
+            rest = {n for n in needed if n not in found}
+            found.update(_find_in_tree(sub, rest, stop))
+        return found
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(subdirs))) as ex:
+        futs = [ex.submit(_find_in_tree, sub, needed, stop) for sub in subdirs]
+        for fut in futs:
+            if len(found) == len(needed):
+                # later folders can't change any winner; let them wind down
+                stop.set()
+                for f in futs:
+                    f.cancel()
+                break
+            for name, path in fut.result().items():
+                found.setdefault(name, path)
+    return found
 
 
 # ---------------------------- asset staging (GitHub Pages) ----------------------------
-def stage_painting_images(points, img_src_dir: str, out_dir: str, img_prefix: str, debug=False):
+def plan_painting_images(points, img_src_dir: str, out_dir: str, img_prefix: str, debug=False):
+    """
+    Work out which painting images to copy. Returns (jobs, log lines); nothing
+    is copied or printed here so the three asset kinds can be planned at once.
+    """
+    log = []
     if not img_src_dir:
-        print("[ASSETS] img-src not provided; images will not be copied.")
-        return
+        log.append("[ASSETS] img-src not provided; images will not be copied.")
+        return [], log
     img_src_dir = os.path.normpath(img_src_dir)
     if not os.path.exists(img_src_dir):
-        print(f"[ASSETS] WARNING: img-src not found: {img_src_dir}")
-        return
+        log.append(f"[ASSETS] WARNING: img-src not found: {img_src_dir}")
+        return [], log
 
     dst_root = os.path.join(out_dir, img_prefix)
     ensure_dir(dst_root)
+    existing = list_dir_names(dst_root)
 
-    idx = build_basename_index(img_src_dir)
-
+    paths = (d.get("img_path") for d in points)
     needed = set()
-    for d in points:
-        p = str(d.get("img_path", "") or "")
-        if not p:
-            continue
-        base = os.path.basename(p.replace("\\", "/"))
-        if base:
-            needed.add(base)
+    needed.update(
+        os.path.basename((p if isinstance(p, str) else str(p)).replace("\\", "/"))
+        for p in paths if p
+    )
+    needed.discard("")
 
+    idx = find_files_by_basename(img_src_dir, needed)
+
+    dst_prefix = dst_root.rstrip(os.sep) + os.sep
     copied = 0
-    missing = 0
-    for base in sorted(needed):
+    missing = []
+    jobs = []
+    for base in needed:
         src = idx.get(base)
-        dst = os.path.join(dst_root, base)
+        dst = dst_prefix + base
         if src and os.path.exists(src):
-            copy_file_if_needed(src, dst)
+            queue_copy_if_needed(jobs, src, dst, existing)
             copied += 1
         else:
-            missing += 1
-            if debug:
-                print(f"[ASSETS] Missing painting image basename='{base}' under img-src")
+            missing.append(base)
+
+    if debug:
+        for base in sorted(missing):
+            log.append(f"[ASSETS] Missing painting image basename='{base}' under img-src")
 
-    print(f"[ASSETS] Painting images staged: copied={copied}, missing={missing}, dst='{dst_root}'")
+    log.append(f"[ASSETS] Painting images staged: copied={copied}, missing={len(missing)}, dst='{dst_root}'")
+    return jobs, log
 
 
-def stage_plots(plots_src_dir: str, out_dir: str, plots_prefix: str, debug=False):
+def plan_plots(plots_src_dir: str, out_dir: str, plots_prefix: str, debug=False):
+    log = []
     if not plots_src_dir:
-        print("[ASSETS] plots-src not provided; arrow JSON will not be copied.")
-        return
+        log.append("[ASSETS] plots-src not provided; arrow JSON will not be copied.")
+        return [], log
     plots_src_dir = os.path.normpath(plots_src_dir)
     if not os.path.exists(plots_src_dir):
-        print(f"[ASSETS] WARNING: plots-src not found: {plots_src_dir}")
-        return
+        log.append(f"[ASSETS] WARNING: plots-src not found: {plots_src_dir}")
+        return [], log
 
     dst_root = os.path.join(out_dir, plots_prefix)
     ensure_dir(dst_root)
+    existing = list_dir_names(dst_root)
 
+    dst_prefix = dst_root.rstrip(os.sep) + os.sep
     copied = 0
-    for r, _dirs, files in os.walk(plots_src_dir):
-        for fn in files:
-            if fn.endswith(".plot.json"):
-                src = os.path.join(r, fn)
-                dst = os.path.join(dst_root, fn)
-                copy_file_if_needed(src, dst)
-                copied += 1
-
-    print(f"[ASSETS] Plot JSON staged: copied={copied}, dst='{dst_root}'")
+    jobs = []
+    for e in iter_file_entries(plots_src_dir):
+        fn = e.name
+        if fn.endswith(".plot.json"):
+            queue_copy_if_needed(jobs, e.path, dst_prefix + fn, existing)
+            copied += 1
+
+    log.append(f"[ASSETS] Plot JSON staged: copied={copied}, dst='{dst_root}'")
     if debug and copied == 0:
-        print("[ASSETS] NOTE: No .plot.json files found in plots-src.")
+        log.append("[ASSETS] NOTE: No .plot.json files found in plots-src.")
+    return jobs, log
 
 
-def stage_balls(balls_src_dir: str, out_dir: str, balls_prefix: str, debug=False):
+def plan_balls(balls_src_dir: str, out_dir: str, balls_prefix: str, debug=False):
+    log = []
     if not balls_src_dir:
-        print("[ASSETS] balls-src not provided; chrome balls will not be copied.")
-        return
+        log.append("[ASSETS] balls-src not provided; chrome balls will not be copied.")
+        return [], log
     balls_src_dir = os.path.normpath(balls_src_dir)
     if not os.path.exists(balls_src_dir):
-        print(f"[ASSETS] WARNING: balls-src not found: {balls_src_dir}")
-        return
+        log.append(f"[ASSETS] WARNING: balls-src not found: {balls_src_dir}")
+        return [], log
 
     dst_root = os.path.join(out_dir, balls_prefix)
     ensure_dir(dst_root)
+    existing = list_dir_names(dst_root)
 
+    dst_prefix = dst_root.rstrip(os.sep) + os.sep
     copied = 0
-    for r, _dirs, files in os.walk(balls_src_dir):
-        for fn in files:
-            low = fn.lower()
-            if low.endswith(".png") and ("_ev-00" in low or "_ev-25" in low or "_ev-50" in low):
-                src = os.path.join(r, fn)
-                dst = os.path.join(dst_root, fn)
-                copy_file_if_needed(src, dst)
-                copied += 1
-
-    print(f"[ASSETS] Chrome balls staged: copied={copied}, dst='{dst_root}'")
+    jobs = []
+    for e in iter_file_entries(balls_src_dir):
+        fn = e.name
+        if _BALL_RE.search(fn):
+            queue_copy_if_needed(jobs, e.path, dst_prefix + fn, existing)
+            copied += 1
+
+    log.append(f"[ASSETS] Chrome balls staged: copied={copied}, dst='{dst_root}'")
     if debug and copied == 0:
-        print("[ASSETS] NOTE: No *_ev-XX.png files found in balls-src.")
+        log.append("[ASSETS] NOTE: No *_ev-XX.png files found in balls-src.")
+    return jobs, log
+
+
+def run_staging(plans):
+    """
+    Run (plan_fn, args, kwargs) entries concurrently, then copy every job in
+    one pass and print each plan's log in order. When two plans target the
+    same destination the earlier one wins, as it did when staging ran serially.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, len(plans))) as ex:
+        futs = [ex.submit(fn, *a, **kw) for fn, a, kw in plans]
+        results = [f.result() for f in futs]
+
+    jobs = []
+    seen = set()
+    for plan_jobs, _ in results:
+        for src, dst in plan_jobs:
+            if dst not in seen:
+                seen.add(dst)
+                jobs.append((src, dst))
+    copy_files(jobs)
+
+    for _, log in results:
+        for line in log:
+            print(line)
 
 
 # ---------------------------- HTML ----------------------------
-def generate_html(all_data_points, img_prefix="data", plots_prefix="plots_embedded", balls_prefix="balls"):
-    html = """<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8" />
-<meta name="viewport" content="width=device-width, initial-scale=1.0" />
-<title>Interactive Light Direction</title>
-<script src="https://cdn.plot.ly/plotly-2.32.0.min.js"></script>
-<style>
-  body { font-family: -apple-system, BlinkMacSystemFont, 'SF Pro Display', 'Helvetica Neue', Arial, sans-serif;
-         margin:0; padding:0; background:#f2f2f7; color:#1d1d1f; }
-  .container { max-width:1480px; margin:32px auto; padding:28px;
-               background:rgba(255,255,255,0.86);
-               border:0.5px solid rgba(0,0,0,0.06);
-               border-radius:14px;
-               box-shadow:0 8px 32px rgba(0,0,0,0.06);
-               backdrop-filter: blur(18px); }
-  .title { text-align:center; font-size:30px; font-weight:650; margin:0 0 10px; letter-spacing:-0.02em; }
-  .row { display:flex; gap:18px; align-items:flex-start; }
-  .left { flex:1; min-width:720px; background:rgba(255,255,255,0.92);
-          border:0.5px solid rgba(0,0,0,0.06); border-radius:14px; padding:18px;
-          box-shadow:0 4px 16px rgba(0,0,0,0.06); }
-  .right { width:440px; background:rgba(255,255,255,0.92);
-           border:0.5px solid rgba(0,0,0,0.06); border-radius:14px; padding:18px;
-           box-shadow:0 4px 16px rgba(0,0,0,0.06); position:sticky; top:18px; }
-  #plot { width:100%; height:680px; border-radius:12px; }
-
-  .controls { display:flex; flex-wrap:wrap; gap:10px; margin-bottom:12px; justify-content:space-between; }
-  .control-box { flex:1; min-width:240px; background:rgba(0,0,0,0.03);
-                 border:1px solid rgba(0,0,0,0.05); border-radius:12px; padding:12px; }
-  .control-title { font-size:13px; font-weight:650; color:#374151; margin-bottom:8px; }
-  select, input[type="text"] { width:100%; padding:10px 12px; border-radius:10px;
-                               border:1px solid rgba(0,0,0,0.10); background:white; outline:none; font-size:14px; }
-  .hint { font-size:12px; color:#6b7280; margin-top:6px; }
-
-  .pillbar { display:flex; gap:8px; flex-wrap:wrap; margin-top:10px; }
-  .pill { padding:6px 10px; border-radius:999px; background:rgba(0,0,0,0.04);
-          border:1px solid rgba(0,0,0,0.06); font-size:12px; color:#374151; }
-
-  .btnrow { display:flex; gap:10px; margin-top:10px; flex-wrap:wrap; }
-  .btn { flex:1; min-width:160px; padding:10px 12px; border-radius:999px; border:0; cursor:pointer;
-         background:rgba(0,0,0,0.04); color:#1d1d1f; font-weight:600;
-         transition:transform 0.15s ease, background 0.15s ease; }
-  .btn:hover { background:rgba(0,122,255,0.12); color:#007aff; transform:translateY(-1px); }
-  .btn.active { background:#007aff; color:#ffffff; box-shadow:0 2px 8px rgba(0,122,255,0.25); }
-
-  .rankbar { display:flex; gap:10px; margin-top:10px; flex-wrap:wrap; }
-  .rankbtn {
-    padding:9px 12px;
-    border-radius:999px;
-    border:1px solid rgba(0,0,0,0.10);
-    background:white;
-    cursor:pointer;
-    font-weight:750;
-    font-size:12px;
-    color:#111827;
-    box-shadow: 0 2px 0 rgba(0,0,0,0.18), 0 8px 18px rgba(0,0,0,0.08);
-    transition: transform 0.12s ease, box-shadow 0.12s ease, opacity 0.12s ease;
-    user-select:none;
-  }
-  .rankbtn:hover { transform: translateY(-1px); }
-  .rankbtn.off {
-    opacity:0.35;
-    box-shadow: 0 1px 0 rgba(0,0,0,0.12), 0 4px 10px rgba(0,0,0,0.06);
-  }
-
-  .panel-title { font-size:18px; font-weight:700; margin:0 0 10px; }
-  .empty { padding:34px 14px; text-align:center; color:#9CA3AF;
-           border:2px dashed rgba(0,0,0,0.10); border-radius:14px; background:rgba(248,249,250,0.6); }
-
-  .kv { margin-top:12px; border:1px solid rgba(0,0,0,0.06); border-radius:12px; overflow:hidden; }
-  .kvrow { display:flex; justify-content:space-between; padding:10px 12px;
-           border-bottom:1px solid rgba(0,0,0,0.06); background:rgba(255,255,255,0.9); }
-  .kvrow:last-child { border-bottom:0; }
-  .k { color:#6b7280; font-size:13px; font-weight:600; }
-  .v { color:#111827; font-size:13px; font-weight:650; text-align:right;
-       max-width:260px; overflow:hidden; text-overflow:ellipsis; white-space:nowrap; }
-
-  table.ranktbl { width:100%; border-collapse:collapse; font-size:12px; margin-top:8px; }
-  table.ranktbl th, table.ranktbl td { padding:6px 6px; border-bottom:1px solid rgba(0,0,0,0.07); vertical-align:top; }
-  table.ranktbl th { text-align:left; color:#374151; font-weight:700; background:rgba(0,0,0,0.02); }
-
-  .badge { display:inline-block; padding:3px 8px; border-radius:999px;
-           background:rgba(0,0,0,0.05); border:1px solid rgba(0,0,0,0.07);
-           font-size:12px; font-weight:650; color:#374151; }
-
-  .neighbors { margin-top:14px; }
-  .neighbors-title { font-weight:800; color:#111827; margin-top:12px; }
-  .neighbor-grid { display:grid; grid-template-columns: 1fr 1fr 1fr; gap:10px; margin-top:10px; }
-  .neighbor-card { background:white; border:1px solid rgba(0,0,0,0.08); border-radius:12px;
-                   padding:8px; cursor:pointer; transition:transform 0.15s ease, box-shadow 0.15s ease; }
-  .neighbor-card:hover { transform:translateY(-2px); box-shadow:0 10px 22px rgba(0,0,0,0.10); border-color:rgba(0,122,255,0.35); }
-  .neighbor-card img { width:100%; height:100px; object-fit:cover; border-radius:10px; }
-  .neighbor-meta { margin-top:6px; font-size:11px; color:#374151; line-height:1.25; }
-  .neighbor-meta .id { font-weight:750; color:#111827; }
-  .neighbor-meta .ang { color:#6b7280; }
-
-  .imgwrap { margin-top:12px; }
-  .imgwrap img { width:100%; border-radius:12px; box-shadow:0 10px 26px rgba(0,0,0,0.18); }
-
-  .plotwrap { margin-top:12px; border:1px solid rgba(0,0,0,0.06); border-radius:12px; overflow:hidden; background:white; }
-  #arrowPlotWrapper {
-    height: 260px;
-    max-height: 260px;
-    width: 100%;
-    overflow: hidden;
-    border-radius: 12px;
-    background: #f8fafc;
-    box-shadow: inset 0 0 0 1px rgba(0,0,0,0.06);
-  }
-  #arrowPlot { width:100%; height:100%; }
-  .smallhint { font-size:12px; color:#6b7280; margin-top:8px; }
-
-  .balls-title { font-weight:800; color:#111827; margin-top:14px; font-size:20px; }
-  .balls-sub { font-size:12px; color:#6b7280; margin-top:6px; }
-
-  .ball-stack { display:flex; flex-direction:column; gap:12px; margin-top:12px; }
-  .ball-card { background:white; border:1px solid rgba(0,0,0,0.08); border-radius:14px;
-               padding:10px; overflow:hidden; }
-  .ball-card img {
-    width: 100%;
-    height: auto;
-    max-height: 520px;
-    object-fit: contain;
-    background: #fff;
-    border-radius: 12px;
-    display: block;
-  }
-  .ball-label { margin-top:8px; font-weight:800; color:#111827; }
-  .ball-fn { margin-top:4px; font-size:12px; color:#6b7280; word-break:break-all; }
-</style>
-</head>
-<body>
-  <div class="container">
-    <h1 class="title">Interactive 3D Light Direction</h1>
-
-    <div class="controls">
-      <div class="control-box">
-        <div class="control-title">Artist filter</div>
-        <select id="artistSelect" onchange="applyFilters()">
-          <option value="__ALL__">All artists</option>
-        </select>
-        <div class="hint">Colors are deterministic per artist (muted palette).</div>
-      </div>
-
-      <div class="control-box">
-        <div class="control-title">Genre filter</div>
-        <select id="genreSelect" onchange="applyFilters()">
-          <option value="__ALL__">All genres</option>
-        </select>
-        <div class="hint">Genre comes from your folder structure.</div>
-      </div>
-
-      <div class="control-box">
-        <div class="control-title">Search (painting id or rank id)</div>
-        <input id="searchBox" type="text" placeholder="Type to find... e.g. 'R2' or name" oninput="applyFilters()" />
-        <div class="hint">Matches painting_info and painting_rank_id.</div>
-      </div>
-    </div>
-
-    <div class="pillbar" id="statsPills"></div>
-
-    <div class="row">
-      <div class="left">
-        <div class="btnrow">
-          <button class="btn" onclick="resetView()">Reset View</button>
-          <button class="btn" onclick="clearSelection()">Clear Selection (ESC)</button>
-        </div>
-
-        <div class="rankbar">
-          <button id="rk1" class="rankbtn" onclick="toggleRank(1)">Rank 1</button>
-          <button id="rk2" class="rankbtn" onclick="toggleRank(2)">Rank 2</button>
-          <button id="rk3" class="rankbtn" onclick="toggleRank(3)">Rank 3</button>
-        </div>
-
-        <div style="margin-top:12px;">
-          <div id="plot"></div>
-        </div>
-      </div>
-
-      <div class="right">
-        <div class="panel-title">Sample Details</div>
-
-        <div class="btnrow" style="margin-top: 0;">
-          <button id="view2dBtn" class="btn active" onclick="showRightPanel('2d')">2D View</button>
-          <button id="view3dBtn" class="btn" onclick="showRightPanel('3d')">3D View</button>
-        </div>
-
-        <div id="details2d">
-          <div id="details">
-            <div class="empty">Click a point to view details.</div>
-          </div>
-        </div>
-
-        <div id="details3d" style="display:none;">
-          <div id="details3dInner">
-            <div class="empty">Click a point to view details.</div>
-          </div>
-        </div>
-      </div>
-    </div>
-  </div>
-
-<script>
-  const IMG_PREFIX = __IMG_PREFIX__;
-  const PLOTS_PREFIX = __PLOTS_PREFIX__;
-  const BALLS_PREFIX = __BALLS_PREFIX__;
-  const dataAll = __DATA_JSON__;
-
-  function safeFilename(name) {
-    const s = String(name ?? "").replace(/[^A-Za-z0-9._-]+/g, "_").replace(/^_+|_+$/g, "");
-    return s ? s : "untitled";
-  }
-
-  function escapeHtml(s){
-    return String(s ?? "")
-      .replaceAll("&","&amp;")
-      .replaceAll("<","&lt;")
-      .replaceAll(">","&gt;")
-      .replaceAll('"',"&quot;")
-      .replaceAll("'","&#039;");
-  }
-
-  dataAll.forEach(d => {
-    d.painting_info = String(d.painting_info ?? d.pose_info ?? "");
-    d.painting_rank_id = String(d.painting_rank_id ?? d.painting_info ?? "");
-    d.rank = (d.rank == null) ? null : Number(d.rank);
-
-    d.artist = String(d.dataset ?? "Unknown");
-    d.genre = String(d.genre_info ?? "Unknown");
-    d.img_path = String(d.img_path ?? "");
-
-    let clean = d.img_path.replaceAll('\\\\', '/');
-    const parts = clean.split("/");
-    clean = parts[parts.length - 1];
-    clean = clean.replace(/^\/+/, '');
-    d.img_url = encodeURI(IMG_PREFIX.replaceAll('\\\\','/') + '/' + clean);
-
-    d.x = Number(d.x);
-    d.y = Number(d.y);
-    d.z = Number(d.z);
-    d.norm = Math.sqrt(d.x*d.x + d.y*d.y + d.z*d.z);
-
-    d.confidence = (d.confidence == null) ? null : Number(d.confidence);
-    if (Number.isNaN(d.confidence)) d.confidence = null;
-
-    d.dominance = (d.dominance == null) ? null : Number(d.dominance);
-    if (Number.isNaN(d.dominance)) d.dominance = null;
-
-    d.dir_norm_raw = (d.dir_norm_raw == null) ? null : Number(d.dir_norm_raw);
-    if (Number.isNaN(d.dir_norm_raw)) d.dir_norm_raw = null;
-
-    d.dir_src_keys = String(d.dir_src_keys ?? "");
-  });
-
-  const byPainting = new Map();
-  dataAll.forEach(d => {
-    const key = d.painting_info;
-    if (!byPainting.has(key)) byPainting.set(key, []);
-    byPainting.get(key).push(d);
-  });
-  byPainting.forEach(arr => arr.sort((a,b) => ((a.rank ?? 99) - (b.rank ?? 99))));
-
-  const repByPainting = new Map();
-  byPainting.forEach((arr, key) => {
-    let rep = arr.find(x => x.rank === 1) ?? arr[0];
-    repByPainting.set(key, rep);
-  });
-
-  const artists = Array.from(new Set(dataAll.map(d => d.artist))).sort((a,b)=>a.localeCompare(b));
-  const genres  = Array.from(new Set(dataAll.map(d => d.genre))).sort((a,b)=>a.localeCompare(b));
-
-  const artistSelect = document.getElementById('artistSelect');
-  artists.forEach(a => { const opt=document.createElement('option'); opt.value=a; opt.textContent=a; artistSelect.appendChild(opt); });
-
-  const genreSelect = document.getElementById('genreSelect');
-  genres.forEach(g => { const opt=document.createElement('option'); opt.value=g; opt.textContent=g; genreSelect.appendChild(opt); });
-
-  function hashString(str) {
-    let h = 2166136261;
-    for (let i=0;i<str.length;i++){ h ^= str.charCodeAt(i); h = Math.imul(h, 16777619); }
-    return h >>> 0;
-  }
-  const MUTED = ["#5B8E7D","#F2D0A4","#B5838D","#6D597A","#A8C686","#E6B8A2","#7EA8BE","#CDB4DB","#9A8C98","#DDBEA9"];
-  const artistColorMap = new Map();
-  function getArtistColor(artist) {
-    if (artistColorMap.has(artist)) return artistColorMap.get(artist);
-    const idx = hashString(String(artist)) % MUTED.length;
-    const color = MUTED[idx];
-    artistColorMap.set(artist, color);
-    return color;
-  }
-
-  function makeLegendTraces() {
-    return artists.map(a => ({
-      type: 'scatter3d',
-      mode: 'markers',
-      name: a,
-      x: [NaN], y: [NaN], z: [NaN],
-      marker: { size: 8, color: getArtistColor(a), opacity: 1.0 },
-      hoverinfo: 'skip',
-      showlegend: true
-    }));
-  }
-
-  function fmtPct(x) {
-    if (x == null || Number.isNaN(x)) return '—';
-    return (x*100).toFixed(0) + '%';
-  }
-
-  let enabledRanks = new Set([1,2,3]);
-  function syncRankButtons(){
-    [1,2,3].forEach(rk => {
-      const el = document.getElementById(`rk${rk}`);
-      if (!el) return;
-      if (enabledRanks.has(rk)) el.classList.remove("off");
-      else el.classList.add("off");
-    });
-  }
-  window.toggleRank = function(rk){
-    if (enabledRanks.has(rk)) enabledRanks.delete(rk);
-    else enabledRanks.add(rk);
-    if (enabledRanks.size === 0) enabledRanks.add(rk);
-    syncRankButtons();
-    applyFilters();
-  }
-
-  let dataFiltered = dataAll.slice();
-  const plotDiv = document.getElementById('plot');
-
-  const defaultRanges = { x: [-1.05, 1.05], y: [-1.05, 1.05], z: [-1.05, 1.05] };
-  const cameraYZ = { eye: {x: 2.6, y: 0.0, z: 0.0}, center: {x:0,y:0,z:0}, up: {x:0,y:0,z:1} };
-  let currentSphereCamera = cameraYZ;
-
-  const baseLayout = {
-    scene: {
-      xaxis: { title: 'dir_x', range: defaultRanges.x, autorange:false, fixedrange:true },
-      yaxis: { title: 'dir_y', range: defaultRanges.y, autorange:false, fixedrange:true },
-      zaxis: { title: 'dir_z', range: defaultRanges.z, autorange:false, fixedrange:true },
-      camera: cameraYZ,
-      aspectmode: 'cube',
-      bgcolor: '#ffffff'
-    },
-    margin: {t:10, b:10, l:10, r:10},
-    paper_bgcolor: '#ffffff',
-    plot_bgcolor: '#ffffff',
-    showlegend: true,
-    legend: {
-      title: { text: "Artist" },
-      bgcolor: "rgba(255,255,255,0.85)",
-      bordercolor: "rgba(0,0,0,0.08)",
-      borderwidth: 1
-    }
-  };
+# page template lives next to this script; read once at import
+HTML_TEMPLATE = Path(__file__).with_name("template.html").read_text(encoding="utf-8")
 
-  const config = { responsive: true, displayModeBar: true, displaylogo: false };
-  function pointSize() { return 3.6; }
+# template split once into [text, token, text, token, ..., text]
+_HTML_TOKEN_RE = re.compile(r"(__(?:IMG_PREFIX|PLOTS_PREFIX|BALLS_PREFIX|DATA_JSON)__)")
+_HTML_PARTS = _HTML_TOKEN_RE.split(HTML_TEMPLATE)
 
-  function makeTrace(points, rank, name, opacity) {
-    if (!enabledRanks.has(rank)) {
-      return { x:[], y:[], z:[], mode:'markers', type:'scatter3d', name,
-               marker:{size:pointSize(), opacity:0.0}, hoverinfo:'skip', showlegend:false };
-    }
-    const pts = points.filter(d => d.rank === rank);
-    return {
-      showlegend: false,
-      x: pts.map(d => d.x),
-      y: pts.map(d => d.y),
-      z: pts.map(d => d.z),
-      mode: 'markers',
-      type: 'scatter3d',
-      name,
-      marker: {
-        size: pointSize(),
-        symbol: 'circle',
-        color: pts.map(d => getArtistColor(d.artist)),
-        opacity: opacity,
-        line: { color: 'rgba(255,255,255,0.6)', width: 0.5 }
-      },
-      text: pts.map(d => {
-        const confText = fmtPct(d.confidence);
-        const normText = Number(d.norm ?? 0).toFixed(3);
-        const rk = (d.rank == null) ? '—' : String(d.rank);
-        const src = d.dir_src_keys ? `Source: ${d.dir_src_keys}<br>` : '';
-        return `${d.painting_info} (R${rk})<br>` +
-               `Artist: ${d.artist}<br>` +
-               `Genre: ${d.genre}<br>` +
-               `Confidence: ${confText}<br>` +
-               `||dir||: ${normText}<br>` +
-               src +
-               `dir: (${Number(d.x).toFixed(3)}, ${Number(d.y).toFixed(3)}, ${Number(d.z).toFixed(3)})`;
-      }),
-      hovertemplate: '%{text}<extra></extra>',
-      customdata: pts
-    };
-  }
-
-  function makeTraces(points) {
-    const rankTraces = [
-      makeTrace(points, 3, 'Rank 3 (25%)', 0.25),
-      makeTrace(points, 2, 'Rank 2 (50%)', 0.50),
-      makeTrace(points, 1, 'Rank 1 (100%)', 1.00),
-    ];
-    return rankTraces.concat(makeLegendTraces());
-  }
-
-  function updateStatsPills() {
-    const pillbar = document.getElementById('statsPills');
-    pillbar.innerHTML = '';
-    const totalPts = dataFiltered.length;
-    const totalAll = dataAll.length;
-    const nPaintings = new Set(dataFiltered.map(d => d.painting_info)).size;
-    const nArtists = new Set(dataFiltered.map(d => d.artist)).size;
-    const nGenres  = new Set(dataFiltered.map(d => d.genre)).size;
-    const confCount = dataFiltered.filter(d => d.confidence != null && !Number.isNaN(d.confidence)).length;
-
-    const mk = (txt) => { const p=document.createElement('div'); p.className='pill'; p.textContent=txt; pillbar.appendChild(p); };
-    mk(`Showing: ${totalPts} / ${totalAll} points`);
-    mk(`Paintings: ${nPaintings}`);
-    mk(`Artists: ${nArtists} | Genres: ${nGenres}`);
-    mk(`Confidence present: ${confCount}/${totalPts}`);
-  }
-
-  function resetView() {
-    Plotly.relayout(plotDiv, {
-      'scene.xaxis.range': defaultRanges.x,
-      'scene.yaxis.range': defaultRanges.y,
-      'scene.zaxis.range': defaultRanges.z,
-      'scene.camera': currentSphereCamera
-    });
-  }
-
-  function clearSelection() {
-    document.getElementById('details').innerHTML =
-      '<div class="empty">Click a point to view details.</div>';
-    document.getElementById('details3dInner').innerHTML =
-      '<div class="empty">Click a point to view details.</div>';
-    lastSelectedPainting = null;
-    resetView();
-  }
-  document.addEventListener('keydown', (e) => { if (e.key === 'Escape') clearSelection(); });
-
-  function clamp(x, lo, hi){ return Math.max(lo, Math.min(hi, x)); }
-  function angleDegBetween(a, b){
-    const dot = clamp(a[0]*b[0] + a[1]*b[1] + a[2]*b[2], -1.0, 1.0);
-    return Math.acos(dot) * 180.0 / Math.PI;
-  }
-
-  function getTop3Neighbors(selectedPaintingInfo){
-    const selRep = repByPainting.get(selectedPaintingInfo);
-    if (!selRep) return [];
-    const a = [selRep.x, selRep.y, selRep.z];
-
-    const visiblePaintings = new Set(dataFiltered.map(d => d.painting_info));
-    const cand = [];
-    for (const pid of visiblePaintings){
-      if (pid === selectedPaintingInfo) continue;
-      const rep = repByPainting.get(pid);
-      if (!rep) continue;
-      const b = [rep.x, rep.y, rep.z];
-      const ang = angleDegBetween(a, b);
-      cand.push({ painting_info: pid, rep: rep, ang_deg: ang });
-    }
-    cand.sort((u,v) => u.ang_deg - v.ang_deg);
-    return cand.slice(0, 3);
-  }
-
-  let lastSelectedPainting = null;
-
-  async function loadArrowPlot3D(baseName) {
-    const plotDiv = document.getElementById('arrowPlot');
-    if (!plotDiv) return;
-
-    const fn = safeFilename(baseName) + ".plot.json";
-    const url = encodeURI(PLOTS_PREFIX.replaceAll('\\\\','/') + "/" + fn);
-
-    plotDiv.innerHTML = "";
-    try {
-      const resp = await fetch(url);
-      if (!resp.ok) {
-        plotDiv.innerHTML = `<div style="padding:12px; color:#b91c1c; font-weight:700;">
-          Arrow plot not found<br>
-          <div style="margin-top:6px; font-weight:600; color:#6b7280;">
-            Expected: ${url}
-          </div>
-        </div>`;
-        return;
-      }
-      const payload = await resp.json();
-
-      const layout = Object.assign({}, payload.layout || {});
-      layout.height = 260;
-      layout.margin = layout.margin || {l:10, r:10, t:40, b:10};
-
-      try { Plotly.purge(plotDiv); } catch (e) {}
-      Plotly.react(plotDiv, payload.data, layout, {displaylogo:false, displayModeBar:true, responsive:true});
-    } catch (e) {
-      plotDiv.innerHTML = `<div style="padding:12px; color:#b91c1c; font-weight:700;">
-        Failed to load arrow plot<br>
-        <div style="margin-top:6px; font-weight:600; color:#6b7280;">${String(e)}</div>
-      </div>`;
-    }
-  }
-
-  function showRightPanel(mode){
-    const rightPanelMode = (mode === '3d') ? '3d' : '2d';
-    const d2 = document.getElementById('details2d');
-    const d3 = document.getElementById('details3d');
-    const b2 = document.getElementById('view2dBtn');
-    const b3 = document.getElementById('view3dBtn');
-
-    if (d2 && d3) {
-      d2.style.display = (rightPanelMode === '2d') ? 'block' : 'none';
-      d3.style.display = (rightPanelMode === '3d') ? 'block' : 'none';
-    }
-    if (b2 && b3) {
-      b2.classList.toggle('active', rightPanelMode === '2d');
-      b3.classList.toggle('active', rightPanelMode === '3d');
+
+def _make_json_encode():
+    """
+    Return encode(obj) -> str for one payload element: orjson (native NumPy,
+    much faster on float-heavy columns) when installed, else the stdlib C encoder.
+    """
+    enc = json.JSONEncoder(ensure_ascii=False, default=_to_json_safe, separators=(",", ":"))
+
+    def encode_std(obj):
+        return enc.encode(_json_ready(obj))
+
+    if orjson is None:
+        return encode_std
+
+    opts = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def encode_orjson(obj):
+        try:
+            return orjson.dumps(obj, default=_to_json_safe, option=opts).decode("utf-8")
+        except TypeError:
+            # orjson rejects a few things json accepts (e.g. ints beyond 64 bits)
+            return encode_std(obj)
+
+    return encode_orjson
+
+
+# fields the page reads, emitted column-major (one array per field).
+# dir_norm_raw isn't shipped: the page derives its own norm.
+PAYLOAD_COLUMNS = (
+    "painting_info", "painting_rank_id", "rank", "dataset", "genre_info", "img_path",
+    "x", "y", "z", "confidence", "dominance", "dir_src_keys",
+)
+_FLOAT_COLUMNS = ("x", "y", "z", "confidence", "dominance")
+# ~float32 precision: far below what 3.6px markers or 3-decimal hover text show, and
+# fine enough that the 2-decimal neighbour angle (acos near 1) is unaffected
+PAYLOAD_FLOAT_DECIMALS = 6
+
+
+def _float_column(values, decimals=PAYLOAD_FLOAT_DECIMALS):
+    vals = [None if v is None else _as_float(v) for v in values]
+    if np is None:
+        return [None if v is None or not math.isfinite(v) else round(v, decimals) for v in vals]
+    # NaN marks missing; it is written as null (orjson) / NaN (json), both read back as null.
+    # Rounded in float64: short reprs ("0.1235") with either encoder, unlike a float32 cast.
+    arr = np.array([math.nan if v is None else v for v in vals], dtype=np.float64)
+    return np.round(arr, decimals)
+
+
+def points_to_columns(points, **known):
+    """
+    Transpose list[dict] points into {field: [values...]} for PAYLOAD_COLUMNS.
+    Keys aren't repeated per point, and float fields become contiguous arrays.
+    Columns passed in `known` (already aligned with `points`) are used as-is
+    instead of being read back from the dicts.
+    A missing painting_info falls back to pose_info, as the page used to do.
+    A derived file_base column (safe_filename of painting_info) is appended.
+    """
+    cols = {k: list(known[k]) if k in known else [d.get(k) for d in points] for k in PAYLOAD_COLUMNS}
+    cols["painting_info"] = [
+        d.get("pose_info") if v is None else v for v, d in zip(cols["painting_info"], points)
+    ]
+    for k in _FLOAT_COLUMNS:
+        cols[k] = _float_column(cols[k])
+    # asset file stem per point (same rule as the page's safeFilename), so the
+    # page doesn't re-derive it for every ball/plot URL
+    cols["file_base"] = [safe_filename("" if v is None else v) for v in cols["painting_info"]]
+    return cols
+
+
+def _write_json_columns(fp, cols):
+    """
+    Stream {field: array} as a JSON object one column at a time, so the full
+    payload never exists as a single string. Each column goes through a C encoder.
+    """
+    encode = _make_json_encode()
+    fp.write("{")
+    for i, (k, col) in enumerate(cols.items()):
+        if i:
+            fp.write(",")
+        fp.write(encode(k))
+        fp.write(":")
+        fp.write(encode(col))
+    fp.write("}")
+
+
+def write_html(fp, all_data_points, img_prefix="data", plots_prefix="plots_embedded", balls_prefix="balls"):
+    """
+    Write the page to `fp`. `all_data_points` is list[dict], or an already
+    column-major mapping as returned by points_to_columns.
+    """
+    cols = all_data_points if isinstance(all_data_points, dict) else points_to_columns(all_data_points)
+    values = {
+        "__IMG_PREFIX__": json.dumps(img_prefix),
+        "__PLOTS_PREFIX__": json.dumps(plots_prefix),
+        "__BALLS_PREFIX__": json.dumps(balls_prefix),
     }
-  }
-  window.showRightPanel = showRightPanel;
-
-  function render3DPanel(d){
-    const wrap = document.getElementById('details3dInner');
-    if (!wrap) return;
-
-    const pid = String(d.painting_info ?? "");
-    const artist = String(d.artist ?? "Unknown");
-    const genre = String(d.genre ?? "Unknown");
-    const base = safeFilename(pid);
-
-    const urls = [
-      { tag: "ev-00", fn: `${base}_ev-00.png` },
-      { tag: "ev-25", fn: `${base}_ev-25.png` },
-      { tag: "ev-50", fn: `${base}_ev-50.png` },
-    ].map(o => ({
-      tag: o.tag,
-      fn: o.fn,
-      url: encodeURI(BALLS_PREFIX.replaceAll('\\\\','/') + "/" + o.fn)
-    }));
-
-    wrap.innerHTML = `
-      <div class="kv">
-        <div class="kvrow"><div class="k">Painting ID</div><div class="v" title="${escapeHtml(pid)}">${escapeHtml(pid)}</div></div>
-        <div class="kvrow"><div class="k">Artist</div><div class="v" title="${escapeHtml(artist)}">${escapeHtml(artist)}</div></div>
-        <div class="kvrow"><div class="k">Genre</div><div class="v" title="${escapeHtml(genre)}">${escapeHtml(genre)}</div></div>
-      </div>
-
-      <div class="balls-title">Chrome balls (ev-00 / ev-25 / ev-50)</div>
-      <div class="balls-sub">Loaded from <b>${escapeHtml(BALLS_PREFIX)}/</b> using <code>${escapeHtml(base)}_ev-XX.png</code></div>
-
-      <div class="ball-stack">
-        ${urls.map(u => `
-          <div class="ball-card">
-            <img src="${u.url}" alt="${escapeHtml(u.tag)}" />
-            <div class="ball-label">${escapeHtml(u.tag)}</div>
-            <div class="ball-fn">${escapeHtml(u.fn)}</div>
-          </div>
-        `).join('')}
-      </div>
-    `;
-  }
-
-  function showDetailsBundle(d) {
-    const details = document.getElementById('details');
-    const siblings = byPainting.get(d.painting_info) ?? [d];
-    lastSelectedPainting = d.painting_info;
-
-    const dom = (d.dominance == null || Number.isNaN(d.dominance))
-      ? '—'
-      : (Number(d.dominance)*100).toFixed(1) + '%';
-
-    const rows = siblings.map(s => {
-      const rk = (s.rank == null) ? '—' : 'R' + String(s.rank);
-      const confText = fmtPct(s.confidence);
-      const dirText  = `(${Number(s.x).toFixed(3)}, ${Number(s.y).toFixed(3)}, ${Number(s.z).toFixed(3)})`;
-      return `
-        <tr>
-          <td><span class="badge">${rk}</span></td>
-          <td>${confText}</td>
-          <td style="font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, 'Liberation Mono', 'Courier New', monospace;">
-            ${dirText}
-          </td>
-        </tr>
-      `;
-    }).join('');
-
-    const neigh = getTop3Neighbors(d.painting_info);
-    const neighHTML = (neigh.length === 0) ? `<div class="k" style="margin-top:8px;">—</div>` : `
-      <div class="neighbor-grid">
-        ${neigh.map(n => {
-          const img = n.rep.img_url;
-          const artist = n.rep.artist ?? "Unknown";
-          const ang = n.ang_deg.toFixed(2);
-          const pid = n.painting_info;
-          return `
-            <div class="neighbor-card" onclick="jumpToPainting('${pid.replaceAll("'", "\\'")}')">
-              <img src="${img}" alt="neighbor">
-              <div class="neighbor-meta">
-                <div class="id" title="${pid}">${pid}</div>
-                <div>${artist}</div>
-                <div class="ang">Δ angle: ${ang}°</div>
-              </div>
-            </div>
-          `;
-        }).join('')}
-      </div>
-    `;
-
-    details.innerHTML = `
-      <div class="kv">
-        <div class="kvrow"><div class="k">Painting ID</div><div class="v" title="${escapeHtml(d.painting_info)}">${escapeHtml(d.painting_info)}</div></div>
-        <div class="kvrow"><div class="k">Artist</div><div class="v" title="${escapeHtml(d.artist)}">${escapeHtml(d.artist)}</div></div>
-        <div class="kvrow"><div class="k">Genre</div><div class="v" title="${escapeHtml(d.genre)}">${escapeHtml(d.genre)}</div></div>
-        <div class="kvrow"><div class="k">Dominance</div><div class="v">${escapeHtml(dom)}</div></div>
-      </div>
-
-      <div class="imgwrap">
-        <img src="${d.img_url}" alt="painting" />
-      </div>
-
-      <div class="plotwrap">
-        <div id="arrowPlotWrapper">
-          <div id="arrowPlot"></div>
-        </div>
-      </div>
-      <div class="smallhint">
-        3D loads from <b>${PLOTS_PREFIX}/</b> using <code>${escapeHtml(safeFilename(d.painting_info))}.plot.json</code>
-      </div>
-
-      <div style="margin-top:12px; font-weight:800; color:#111827;">All ranks for this painting</div>
-      <table class="ranktbl">
-        <thead>
-          <tr>
-            <th>Rank</th>
-            <th>Confidence</th>
-            <th>dir</th>
-          </tr>
-        </thead>
-        <tbody>
-          ${rows}
-        </tbody>
-      </table>
-
-      <div class="neighbors">
-        <div class="neighbors-title">Similar paintings (closest lighting direction)</div>
-        ${neighHTML}
-      </div>
-    `;
-
-    loadArrowPlot3D(lastSelectedPainting);
-    render3DPanel(d);
-  }
-
-  window.jumpToPainting = function(pid){
-    const rep = repByPainting.get(pid);
-    if (!rep) return;
-    showDetailsBundle(rep);
-  }
-
-  function applyFilters() {
-    const a = artistSelect.value;
-    const g = genreSelect.value;
-    const q = document.getElementById('searchBox').value.trim().toLowerCase();
-
-    dataFiltered = dataAll.filter(d => {
-      const okA = (a === '__ALL__') ? true : d.artist === a;
-      const okG = (g === '__ALL__') ? true : d.genre === g;
-      const hay1 = (d.painting_info ?? "").toLowerCase();
-      const hay2 = (d.painting_rank_id ?? "").toLowerCase();
-      const okQ = (!q) ? true : (hay1.includes(q) || hay2.includes(q));
-      return okA && okG && okQ;
-    });
-
-    updateStatsPills();
-    syncRankButtons();
-    Plotly.react(plotDiv, makeTraces(dataFiltered), baseLayout, config);
-    resetView();
-  }
-
-  window.applyFilters = applyFilters;
-  window.resetView = resetView;
-  window.clearSelection = clearSelection;
-
-  updateStatsPills();
-  syncRankButtons();
-
-  Plotly.newPlot(plotDiv, makeTraces(dataFiltered), baseLayout, config).then(() => {
-    Plotly.relayout(plotDiv, { 'scene.camera': cameraYZ });
-    showRightPanel('2d');
-
-    plotDiv.on('plotly_click', (evt) => {
-      const d = evt.points?.[0]?.customdata;
-      if (!d) return;
-      showDetailsBundle(d);
-      showRightPanel('2d');
-    });
-  });
-</script>
-</body>
-</html>"""
-
-    img_prefix_json = json.dumps(img_prefix)
-    plots_prefix_json = json.dumps(plots_prefix)
-    balls_prefix_json = json.dumps(balls_prefix)
-    data_json = json.dumps(all_data_points, ensure_ascii=False, default=_to_json_safe)
-
-    html = html.replace("__IMG_PREFIX__", img_prefix_json)
-    html = html.replace("__PLOTS_PREFIX__", plots_prefix_json)
-    html = html.replace("__BALLS_PREFIX__", balls_prefix_json)
-    html = html.replace("__DATA_JSON__", data_json)
-    return html
+    for i, part in enumerate(_HTML_PARTS):
+        if i % 2 == 0:
+            fp.write(part)
+        elif part == "__DATA_JSON__":
+            _write_json_columns(fp, cols)
+        else:
+            fp.write(values[part])
 
 
 # ---------------------------- main ----------------------------
@@ -1083,8 +864,11 @@ def main():
             debug=args.debug
         )
 
+        conf_by_id = index_confidence_by_id(conf_map)
+
         hit = 0
         miss = 0
+        confs = []
         for d in all_data:
             rk_raw = d.get("rank", 1)
             try:
@@ -1092,63 +876,63 @@ def main():
             except Exception:
                 rk = 1
 
-            candidates = [
-                d.get("painting_info", ""),
-                d.get("painting_rank_id", ""),
-                d.get("pose_info", ""),
-                d.get("img_path", ""),
-                d.get("file", ""),
-            ]
-
             conf = None
-            for cand in candidates:
+            for key in CONF_ID_KEYS:
+                cand = d.get(key)
                 if not cand:
                     continue
                 base_id, _ = _normalize_id_and_ev(cand)
                 if not base_id:
                     continue
-                v = conf_map.get((base_id, rk))
+                by_rank = conf_by_id.get(base_id)
+                if by_rank is None:
+                    continue
+                v = by_rank.get(rk)
                 if v is not None:
                     conf = float(v)
                     break
 
-            d["confidence"] = conf
+            confs.append(conf)
             if conf is None:
                 miss += 1
             else:
                 hit += 1
         print(f"confidence matched={hit} | missing={miss} | total={len(all_data)}")
     else:
+        confs = None
         print("csv-path not provided; confidence disabled (will show '—').")
 
-    # physical xyz
-    used = []
+    # physical xyz, kept as parallel columns rather than written into each dict
     skipped = 0
-    key_counter = Counter()
-
-    for d in all_data:
+    found_idx = []
+    srcs = []
+    xs, ys, zs = [], [], []
+    for i, d in enumerate(all_data):
         x, y, z, src = extract_direction_components(d)
         if x is None:
             skipped += 1
             continue
-
-        if args.no_normalize:
-            ux, uy, uz = x, y, z
-            nraw = math.sqrt(x * x + y * y + z * z)
-        else:
-            ux, uy, uz, nraw = normalize_vec(x, y, z)
-            if ux is None:
-                skipped += 1
-                continue
-
-        d["x"] = float(ux)
-        d["y"] = float(uy)
-        d["z"] = float(uz)
-        d["dir_norm_raw"] = None if (nraw is None or not math.isfinite(nraw)) else float(nraw)
-        d["dir_src_keys"] = src
-
-        key_counter[src] += 1
-        used.append(d)
+        found_idx.append(i)
+        srcs.append(src)
+        xs.append(x)
+        ys.append(y)
+        zs.append(z)
+
+    ux, uy, uz, ok = unit_direction_columns(xs, ys, zs, normalize=not args.no_normalize)
+    skipped += ok.count(False)
+    used_idx = list(compress(found_idx, ok))
+    used = [all_data[i] for i in used_idx]
+    used_srcs = list(compress(srcs, ok))
+    key_counter = Counter(used_srcs)
+
+    known = {
+        "x": compress(ux, ok),
+        "y": compress(uy, ok),
+        "z": compress(uz, ok),
+        "dir_src_keys": used_srcs,
+    }
+    if confs is not None:
+        known["confidence"] = [confs[i] for i in used_idx]
 
     print(f"Physical xyz applied to: {len(used)} points | skipped(no physical dir): {skipped}")
     if len(used) == 0:
@@ -1159,24 +943,25 @@ def main():
     for k, v in key_counter.most_common(10):
         print(f"  {k}: {v}")
 
-    # stage assets
-    stage_painting_images(used, args.img_src, out_dir, args.img_prefix, debug=args.debug)
+    # stage assets: walk the three sources concurrently, then copy in one pass
+    plans = [(plan_painting_images, (used, args.img_src, out_dir, args.img_prefix), {"debug": args.debug})]
     if args.plots_src:
-        stage_plots(args.plots_src, out_dir, args.plots_prefix, debug=args.debug)
+        plans.append((plan_plots, (args.plots_src, out_dir, args.plots_prefix), {"debug": args.debug}))
     if args.balls_src:
-        stage_balls(args.balls_src, out_dir, args.balls_prefix, debug=args.debug)
+        plans.append((plan_balls, (args.balls_src, out_dir, args.balls_prefix), {"debug": args.debug}))
+    run_staging(plans)
 
     # write HTML
-    html_content = generate_html(
-        used,
-        img_prefix=args.img_prefix,
-        plots_prefix=args.plots_prefix,
-        balls_prefix=args.balls_prefix
-    )
-
     out_html = os.path.join(out_dir, "index.html")
-    with open(out_html, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    # 1 MiB buffer: the payload is streamed as many small column writes
+    with open(out_html, "w", encoding="utf-8", buffering=1 << 20) as f:
+        write_html(
+            f,
+            points_to_columns(used, **known),
+            img_prefix=args.img_prefix,
+            plots_prefix=args.plots_prefix,
+            balls_prefix=args.balls_prefix
+        )
 
     print("\n" + "=" * 44)
     print(f"FINISH! Output file: {out_html}")